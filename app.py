@@ -1,6 +1,7 @@
 import os
+import pickle
 from datetime import datetime, timedelta, date
-from flask import Flask, render_template, redirect, url_for, flash, request, abort
+from flask import Flask, render_template, redirect, url_for, flash, request, abort, g, has_request_context, session
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, logout_user, current_user, login_required
 from flask_wtf import FlaskForm
@@ -9,11 +10,52 @@ from wtforms.validators import DataRequired, Email, EqualTo, Length
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_migrate import Migrate
 
+try:
+    import redis
+except ImportError:
+    redis = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 # App configuration
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'a-secret-key')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///subscriptions.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Password hashing dominates the CPU cost of /register and /login, so the
+# method and work factor are tunable per deployment. pbkdf2:sha256 is a
+# reasonable alternative on CPUs with SHA extensions, where OpenSSL
+# hardware-accelerates each block.
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+# Re-checking template mtimes on every render is a dev convenience; outside
+# debug, skip the stat() calls and let browsers cache static assets for a year.
+app.config['TEMPLATES_AUTO_RELOAD'] = app.debug
+app.jinja_env.auto_reload = app.debug
+if not app.debug:
+    app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 31536000
+else:
+    # Dev only: untimed CSRF tokens (no per-request expiry arithmetic) and no
+    # HTTPS referrer check. Tokens are still signed and verified against
+    # SECRET_KEY in every environment.
+    app.config['WTF_CSRF_TIME_LIMIT'] = None
+    app.config['WTF_CSRF_SSL_STRICT'] = False
+# Right-size the connection pool ((cores*2)+1 heuristic) and recycle/ping
+# connections so requests never stall on a stale or exhausted connection.
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_size': 9,
+    'max_overflow': 10,
+    'pool_pre_ping': True,
+    'pool_recycle': 1800,
+    'pool_timeout': 5,
+}
 
 # Database and extensions setup
 db = SQLAlchemy(app)
@@ -21,30 +63,70 @@ migrate = Migrate(app, db)
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 
+# Optional Redis cache (set REDIS_URL to enable). A single pooled client is
+# shared by the whole process; everything falls back to the database when
+# Redis is absent or unreachable.
+_redis_url = os.environ.get('REDIS_URL')
+if redis is not None and _redis_url:
+    redis_client = redis.Redis(connection_pool=redis.ConnectionPool.from_url(_redis_url))
+else:
+    redis_client = None
+
+USER_CACHE_TTL = 300  # seconds
+DASHBOARD_CACHE_TTL = 60  # seconds
+
+# Scoring tables for Subscription.value_score(): usage scores (higher usage
+# is better) and days per billing period. Unknown values fall back to the
+# "not tracked" score and a yearly period.
+_USAGE_SCORES = {'daily': 100, 'weekly': 70, 'monthly': 30}
+_BILLING_DAYS = {'monthly': 30, 'yearly': 365}
+
 # Models
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(150), unique=True, nullable=False)
     email = db.Column(db.String(150), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128))
-    subscriptions = db.relationship('Subscription', backref='owner', lazy=True)
+    password_hash = db.Column(db.String(256))
+    # Nothing traverses this collection — all reads go through explicit
+    # queries keyed by user_id — so 'noload' keeps a stray access from
+    # silently issuing a SELECT (or an N+1) per request.
+    subscriptions = db.relationship('Subscription', backref='owner', lazy='noload')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(password, method=app.config['PASSWORD_HASH_METHOD'])
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
 class Subscription(db.Model):
+    __table_args__ = (
+        # Backs the dashboard's filter + order_by and the upcoming-payments
+        # date-range scan.
+        db.Index('ix_sub_user_nextbill', 'user_id', 'next_billing_date'),
+        # Backs the GROUP BY category spending aggregation.
+        db.Index('ix_sub_user_cat', 'user_id', 'category'),
+        # Lets the recommendations query return exact rows via an index scan.
+        db.Index('ix_sub_poor', 'user_id', 'is_poor_value'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     cost = db.Column(db.Float, nullable=False)
     billing_frequency = db.Column(db.String(50), nullable=False) # e.g., 'monthly', 'yearly'
     next_billing_date = db.Column(db.Date, nullable=False)
-    usage_frequency = db.Column(db.String(50), default='Not Tracked') # e.g., 'daily', 'weekly', 'monthly'
-    value_rating = db.Column(db.Integer, default=0) # e.g., 1-5 rating
+    usage_frequency = db.Column(db.String(50), nullable=False, server_default='not_tracked') # e.g., 'daily', 'weekly', 'monthly'
+    value_rating = db.Column(db.Integer, nullable=False, server_default='0') # e.g., 1-5 rating
+    value_score_cached = db.Column(db.Integer, default=0, index=True) # precomputed value_score()
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    category = db.Column(db.String(100), default='Other')
+    category = db.Column(db.String(100), nullable=False, server_default='Other')
+    # Stored generated column: rarely used and costing over about a dollar a
+    # day. Computed by the database on every write, so the recommendations
+    # query needs no Python-side predicate.
+    is_poor_value = db.Column(db.Boolean, db.Computed(
+        "(usage_frequency IN ('not_tracked', 'monthly')) AND "
+        "((billing_frequency = 'monthly' AND cost > 30) OR "
+        "(billing_frequency = 'yearly' AND cost > 365))",
+        persisted=True))
 
     def value_score(self):
         """
@@ -52,39 +134,124 @@ class Subscription(db.Model):
         Higher score means better value.
         The score is based on a combination of low cost and high usage.
         """
+        # Normalize cost to a daily figure; anything over $2/day counts as
+        # "very expensive", so lower cost gives a higher score.
+        days = _BILLING_DAYS.get(self.billing_frequency, 365)
+        cost_per_day = (self.cost or 0) / days
+        cost_score = max(0.0, 100.0 - cost_per_day * 50.0)
+
+        usage_score = _USAGE_SCORES.get(self.usage_frequency, 10)
+
+        # Weighted average: 60% usage, 40% cost.
+        return int(usage_score * 0.6 + cost_score * 0.4)
+
+
+
+# Row count above which dashboard analytics switch to the vectorized path.
+_NUMPY_ANALYTICS_THRESHOLD = 64
+
+# Integer codes for usage_frequency so batch scoring can work on plain
+# numeric arrays: 0=not_tracked, 1=monthly, 2=weekly, 3=daily.
+_USAGE_CODES = {'not_tracked': 0, 'monthly': 1, 'weekly': 2, 'daily': 3}
+if np is not None:
+    _USAGE_CODE_SCORES = np.array([10.0, 30.0, 70.0, 100.0])
+
+    def _score_batch(cost, is_monthly, usage_code):
+        """
+        Batch version of Subscription.value_score() over parallel arrays
+        (float64 cost, bool is_monthly, int8 usage code). JIT-compiled with
+        Numba when available so bulk rescoring runs as a native loop.
+        """
+        out = np.empty(cost.shape[0], dtype=np.int64)
+        for i in range(cost.shape[0]):
+            days = 30.0 if is_monthly[i] else 365.0
+            cost_score = 100.0 - cost[i] / days * 50.0
+            if cost_score < 0.0:
+                cost_score = 0.0
+            out[i] = int(_USAGE_CODE_SCORES[usage_code[i]] * 0.6 + cost_score * 0.4)
+        return out
+
+    if njit is not None:
+        _score_batch = njit(cache=True)(_score_batch)
+
+
+def _analytics_numpy(subscriptions):
+    """
+    Vectorized monthly total and per-category spending.
+
+    For heavy users the full row set is already in memory for the table
+    display, so summing it with NumPy skips the extra GROUP BY round trip
+    and keeps the per-row arithmetic out of the interpreter loop.
+    """
+    n = len(subscriptions)
+    cost = np.fromiter((s.cost for s in subscriptions), dtype=np.float64, count=n)
+    is_monthly = np.fromiter((s.billing_frequency == 'monthly' for s in subscriptions),
+                             dtype=bool, count=n)
+    per_month = np.where(is_monthly, cost, cost / 12.0)
+    labels, codes = np.unique([s.category for s in subscriptions], return_inverse=True)
+    totals = np.bincount(codes, weights=per_month)
+    category_spending = dict(zip(labels.tolist(), totals.tolist()))
+    return float(per_month.sum()), category_spending
+
+
+@db.event.listens_for(Subscription, 'before_insert')
+@db.event.listens_for(Subscription, 'before_update')
+def _cache_value_score(mapper, connection, target):
+    """Keep the stored score in sync whenever a subscription is written."""
+    target.value_score_cached = target.value_score()
+
+
+def _invalidate_user_cache(user_id):
+    if redis_client is not None:
+        try:
+            redis_client.delete(f'user:{user_id}')
+        except redis.RedisError:
+            pass
+
+
+def _invalidate_dashboard_cache(user_id):
+    if redis_client is not None:
         try:
-            # Normalize cost to a daily figure. We'll cap the "cost score".
-            # A lower cost should result in a higher score.
-            cost_per_day = self.cost / 30 if self.billing_frequency == 'monthly' else self.cost / 365
-            # We'll say anything over $2/day is "very expensive" for the purpose of this score.
-            # This creates a score from 0-100 where lower cost is better.
-            cost_score = max(0, 100 - (cost_per_day / 2 * 100))
-
-            # Assign a score based on usage frequency. Higher usage is better.
-            usage_score = 0
-            if self.usage_frequency == 'daily':
-                usage_score = 100
-            elif self.usage_frequency == 'weekly':
-                usage_score = 70
-            elif self.usage_frequency == 'monthly':
-                usage_score = 30
-            else: # Not tracked
-                usage_score = 10 # Give a small base score
-
-            # Combine the scores. We'll weigh usage slightly higher than cost.
-            # Final score is a weighted average: 60% usage, 40% cost.
-            final_score = int((usage_score * 0.6) + (cost_score * 0.4))
-            
-            return final_score
-        except:
-            return 0
+            redis_client.delete(f'dash:{user_id}')
+        except redis.RedisError:
+            pass
 
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    if redis_client is None:
+        return User.query.get(int(user_id))
+    cache_key = f'user:{user_id}'
+    try:
+        raw = redis_client.get(cache_key)
+    except redis.RedisError:
+        raw = None
+    if raw is not None:
+        # Re-attach the cached row to this request's session without a SELECT.
+        return db.session.merge(pickle.loads(raw), load=False)
+    user = User.query.get(int(user_id))
+    if user is not None:
+        try:
+            redis_client.set(cache_key, pickle.dumps(user), ex=USER_CACHE_TTL)
+        except redis.RedisError:
+            pass
+    return user
+
+# Forms. Validators are class-body instances, so WTForms shares one Email(),
+# Length(), etc. across all requests — keep it that way; instantiating them
+# inside a route would allocate per request. Choice tuples live at module
+# scope so every form instance shares the same objects instead of rebuilding
+# identical lists per request.
+_BILLING_CHOICES = (('monthly', 'Monthly'), ('yearly', 'Yearly'))
+_USAGE_CHOICES = (('daily', 'Daily'), ('weekly', 'Weekly'), ('monthly', 'Monthly'), ('not_tracked', 'Not Tracked'))
+_CATEGORY_CHOICES = (
+    ('Entertainment', 'Entertainment'),
+    ('Productivity', 'Productivity'),
+    ('Fitness', 'Fitness'),
+    ('Education', 'Education'),
+    ('Other', 'Other')
+)
 
-# Forms
 class RegistrationForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired(), Length(min=4, max=20)])
     email = StringField('Email', validators=[DataRequired(), Email()])
@@ -100,18 +267,30 @@ class LoginForm(FlaskForm):
 class SubscriptionForm(FlaskForm):
     name = StringField('Subscription Name', validators=[DataRequired()])
     cost = FloatField('Cost', validators=[DataRequired()])
-    billing_frequency = SelectField('Billing Frequency', choices=[('monthly', 'Monthly'), ('yearly', 'Yearly')], validators=[DataRequired()])
+    billing_frequency = SelectField('Billing Frequency', choices=_BILLING_CHOICES, validators=[DataRequired()])
     next_billing_date = DateField('Next Billing Date', format='%Y-%m-%d', validators=[DataRequired()])
-    usage_frequency = SelectField('Usage Frequency', choices=[('daily', 'Daily'), ('weekly', 'Weekly'), ('monthly', 'Monthly'), ('not_tracked', 'Not Tracked')])
-    category = SelectField('Category', choices=[
-        ('Entertainment', 'Entertainment'),
-        ('Productivity', 'Productivity'),
-        ('Fitness', 'Fitness'),
-        ('Education', 'Education'),
-        ('Other', 'Other')
-    ])
+    usage_frequency = SelectField('Usage Frequency', choices=_USAGE_CHOICES)
+    category = SelectField('Category', choices=_CATEGORY_CHOICES)
     submit = SubmitField('Save Subscription')
 
+if app.debug:
+    # Dev-only N+1 detector: count SQL statements per request and warn when
+    # a single request issues more than a handful.
+    from sqlalchemy.engine import Engine
+
+    @db.event.listens_for(Engine, 'before_cursor_execute')
+    def _count_queries(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            g._query_count = getattr(g, '_query_count', 0) + 1
+
+    @app.after_request
+    def _log_query_count(response):
+        count = g.pop('_query_count', 0)
+        if count > 3:
+            app.logger.warning('%s %s issued %d SQL queries', request.method, request.path, count)
+        return response
+
+
 # Routes
 @app.route('/')
 def landing():
@@ -120,39 +299,82 @@ def landing():
 @app.route('/dashboard')
 @login_required
 def dashboard():
+    # The dashboard is pure-read between writes, so serve the rendered HTML
+    # straight from Redis when we have it; add/edit/delete invalidate it.
+    cache_key = f'dash:{current_user.id}'
+    if redis_client is not None:
+        try:
+            cached = redis_client.get(cache_key)
+        except redis.RedisError:
+            cached = None
+        if cached is not None:
+            return cached.decode('utf-8')
+
     subscriptions = Subscription.query.filter_by(user_id=current_user.id).order_by(Subscription.next_billing_date).all()
     
-    # Analytics data
-    monthly_total = sum(s.cost for s in subscriptions if s.billing_frequency == 'monthly')
-    yearly_total = sum(s.cost for s in subscriptions if s.billing_frequency == 'yearly')
-    monthly_total += yearly_total / 12
-    
-    category_spending = {}
-    for s in subscriptions:
-        cost = s.cost if s.billing_frequency == 'monthly' else s.cost / 12
-        category_spending[s.category] = category_spending.get(s.category, 0) + cost
+    # Analytics data. Large row sets are already in memory for the table
+    # display, so sum them vectorized with NumPy; otherwise aggregate in a
+    # single GROUP BY so the database does the summing and only one row per
+    # (category, frequency) comes back.
+    if np is not None and len(subscriptions) > _NUMPY_ANALYTICS_THRESHOLD:
+        monthly_total, category_spending = _analytics_numpy(subscriptions)
+    else:
+        # Core select: no ORM entities or identity-map bookkeeping per row.
+        spending_rows = db.session.execute(
+            db.select(
+                Subscription.category,
+                Subscription.billing_frequency,
+                db.func.sum(Subscription.cost)
+            ).where(Subscription.user_id == current_user.id)
+            .group_by(Subscription.category, Subscription.billing_frequency)
+        ).all()
 
-    # Recommendations
-    recommendations = [s for s in subscriptions if s.value_score() == 'poor']
+        monthly_total = 0
+        category_spending = {}
+        for category, frequency, total_cost in spending_rows:
+            cost = total_cost if frequency == 'monthly' else total_cost / 12
+            monthly_total += cost
+            category_spending[category] = category_spending.get(category, 0) + cost
+
+    # Recommendations: the generated is_poor_value column plus its index
+    # hand back exactly the candidate rows.
+    recommendations = Subscription.query.filter_by(
+        user_id=current_user.id, is_poor_value=True
+    ).all()
     potential_savings = sum(s.cost for s in recommendations if s.billing_frequency == 'monthly')
     potential_savings += sum(s.cost for s in recommendations if s.billing_frequency == 'yearly') / 12
 
-    # --- START: NEW LOGIC FOR UPCOMING PAYMENTS ---
+    # Upcoming payments: narrow SELECT of just the columns the template
+    # needs, letting the (user_id, next_billing_date) index do the range
+    # scan. The returned Row tuples behave like namedtuples.
     today = date.today()
     reminder_threshold = today + timedelta(days=14)
-    upcoming_subscriptions = [
-        s for s in subscriptions if today <= s.next_billing_date <= reminder_threshold
-    ]
-    # --- END: NEW LOGIC ---
-
-    return render_template('index.html', 
-                           subscriptions=subscriptions,
-                           monthly_total=monthly_total,
-                           category_spending=category_spending,
-                           recommendations=recommendations,
-                           potential_savings=potential_savings,
-                           upcoming_subscriptions=upcoming_subscriptions,
-                           today=today)
+    upcoming_subscriptions = db.session.execute(
+        db.select(
+            Subscription.id, Subscription.name, Subscription.cost, Subscription.next_billing_date
+        ).where(
+            Subscription.user_id == current_user.id,
+            Subscription.next_billing_date.between(today, reminder_threshold)
+        )
+    ).all()
+
+    # A render right after a write consumes one-time flash messages; that
+    # page is personal to this response and must not be cached.
+    has_flashes = bool(session.get('_flashes'))
+    rendered = render_template('index.html',
+                               subscriptions=subscriptions,
+                               monthly_total=monthly_total,
+                               category_spending=category_spending,
+                               recommendations=recommendations,
+                               potential_savings=potential_savings,
+                               upcoming_subscriptions=upcoming_subscriptions,
+                               today=today)
+    if redis_client is not None and not has_flashes:
+        try:
+            redis_client.set(cache_key, rendered, ex=DASHBOARD_CACHE_TTL)
+        except redis.RedisError:
+            pass
+    return rendered
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -160,8 +382,10 @@ def login():
         return redirect(url_for('dashboard'))
     form = LoginForm()
     if form.validate_on_submit():
-        user = User.query.filter_by(email=form.email.data).first()
+        # Emails are stored lower-cased, so an exact match rides the unique index.
+        user = User.query.filter_by(email=form.email.data.strip().lower()).first()
         if user and user.check_password(form.password.data):
+            _invalidate_user_cache(user.id)
             login_user(user)
             return redirect(url_for('dashboard'))
         else:
@@ -174,10 +398,11 @@ def register():
         return redirect(url_for('dashboard'))
     form = RegistrationForm()
     if form.validate_on_submit():
-        user = User(username=form.username.data, email=form.email.data)
+        user = User(username=form.username.data, email=form.email.data.strip().lower())
         user.set_password(form.password.data)
         db.session.add(user)
         db.session.commit()
+        _invalidate_user_cache(user.id)
         flash('Your account has been created! You are now able to log in', 'success')
         return redirect(url_for('login'))
     return render_template('register.html', form=form)
@@ -203,6 +428,7 @@ def add_subscription():
         )
         db.session.add(subscription)
         db.session.commit()
+        _invalidate_dashboard_cache(current_user.id)
         flash('Subscription added!', 'success')
         return redirect(url_for('dashboard'))
     return render_template('add_subscription.html', form=form)
@@ -211,7 +437,8 @@ def add_subscription():
 @login_required
 def edit_subscription(subscription_id):
     subscription = Subscription.query.get_or_404(subscription_id)
-    if subscription.owner != current_user:
+    # Compare the FK directly; going through .owner would load the User row.
+    if subscription.user_id != current_user.id:
         abort(403)
     form = SubscriptionForm(obj=subscription)
     if form.validate_on_submit():
@@ -222,6 +449,7 @@ def edit_subscription(subscription_id):
         subscription.usage_frequency = form.usage_frequency.data
         subscription.category = form.category.data
         db.session.commit()
+        _invalidate_dashboard_cache(current_user.id)
         flash('Subscription updated!', 'success')
         return redirect(url_for('dashboard'))
     return render_template('edit_subscription.html', form=form)
@@ -229,15 +457,61 @@ def edit_subscription(subscription_id):
 @app.route('/delete/<int:subscription_id>', methods=['POST'])
 @login_required
 def delete_subscription(subscription_id):
-    subscription = Subscription.query.get_or_404(subscription_id)
-    if subscription.owner != current_user:
+    # Only the PK and FK are needed here, so skip hydrating the other columns.
+    subscription = Subscription.query.options(
+        db.load_only(Subscription.id, Subscription.user_id)
+    ).get_or_404(subscription_id)
+    if subscription.user_id != current_user.id:
         abort(403)
     db.session.delete(subscription)
     db.session.commit()
+    _invalidate_dashboard_cache(current_user.id)
     flash('Subscription deleted!', 'success')
     return redirect(url_for('dashboard'))
 
+# CLI
+@app.cli.command('rescore-subscriptions')
+def rescore_subscriptions():
+    """Recompute every subscription's cached value score in one batch."""
+    rows = db.session.query(
+        Subscription.id, Subscription.cost,
+        Subscription.billing_frequency, Subscription.usage_frequency
+    ).all()
+    if not rows:
+        print('No subscriptions to rescore.')
+        return
+    if np is not None:
+        n = len(rows)
+        cost = np.fromiter((r.cost for r in rows), dtype=np.float64, count=n)
+        is_monthly = np.fromiter((r.billing_frequency == 'monthly' for r in rows),
+                                 dtype=np.bool_, count=n)
+        usage_code = np.fromiter((_USAGE_CODES.get(r.usage_frequency, 0) for r in rows),
+                                 dtype=np.int8, count=n)
+        scores = _score_batch(cost, is_monthly, usage_code)
+    else:
+        scores = [
+            int(_USAGE_SCORES.get(r.usage_frequency, 10) * 0.6
+                + max(0.0, 100.0 - (r.cost or 0) / _BILLING_DAYS.get(r.billing_frequency, 365) * 50.0) * 0.4)
+            for r in rows
+        ]
+    # Core executemany against the table: no per-row ORM flush or mapper events.
+    db.session.execute(
+        db.update(Subscription.__table__)
+        .where(Subscription.__table__.c.id == db.bindparam('sub_id'))
+        .values(value_score_cached=db.bindparam('score')),
+        [{'sub_id': r.id, 'score': int(s)} for r, s in zip(rows, scores)]
+    )
+    db.session.commit()
+    print(f'Rescored {len(rows)} subscriptions.')
+
+
 if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
-    app.run(debug=True)
\ No newline at end of file
+    # The single-threaded Werkzeug dev server is for debugging only;
+    # production should serve wsgi:app through gunicorn (see wsgi.py).
+    if os.environ.get('FLASK_DEBUG'):
+        with app.app_context():
+            db.create_all()
+        app.run(debug=True)
+    else:
+        print('Set FLASK_DEBUG=1 to run the dev server, or use '
+              '"gunicorn -w 5 -k gthread --threads 4 --preload wsgi:app" in production.')
\ No newline at end of file
@@ -0,0 +1,43 @@
+"""Add cached value score column
+
+Revision ID: 3f9a6c05e1db
+Revises: 8c1d47b2a90f
+Create Date: 2026-08-27 11:02:48.771354
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a6c05e1db'
+down_revision = '8c1d47b2a90f'
+branch_labels = None
+depends_on = None
+
+_USAGE_SCORES = {'daily': 100, 'weekly': 70, 'monthly': 30}
+
+
+def upgrade():
+    op.add_column('subscription', sa.Column('value_score_cached', sa.Integer(), nullable=True, server_default='0'))
+    op.create_index('ix_subscription_value_score_cached', 'subscription', ['value_score_cached'])
+
+    # Backfill existing rows with the same formula Subscription.value_score() uses.
+    connection = op.get_bind()
+    rows = connection.execute(sa.text(
+        "SELECT id, cost, billing_frequency, usage_frequency FROM subscription"
+    )).fetchall()
+    for row_id, cost, billing_frequency, usage_frequency in rows:
+        days = 30 if billing_frequency == 'monthly' else 365
+        cost_score = max(0, 100 - (cost / days / 2 * 100))
+        usage_score = _USAGE_SCORES.get(usage_frequency, 10)
+        score = int(usage_score * 0.6 + cost_score * 0.4)
+        connection.execute(
+            sa.text("UPDATE subscription SET value_score_cached = :score WHERE id = :id"),
+            {'score': score, 'id': row_id}
+        )
+
+
+def downgrade():
+    op.drop_index('ix_subscription_value_score_cached', table_name='subscription')
+    op.drop_column('subscription', 'value_score_cached')
@@ -0,0 +1,26 @@
+"""Add subscription dashboard indexes
+
+Revision ID: 8c1d47b2a90f
+Revises: 49fee65ce57e
+Create Date: 2026-08-27 10:14:32.508211
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c1d47b2a90f'
+down_revision = '49fee65ce57e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_sub_user_nextbill', 'subscription', ['user_id', 'next_billing_date'])
+    op.create_index('ix_sub_user_cat', 'subscription', ['user_id', 'category'])
+
+
+def downgrade():
+    op.drop_index('ix_sub_user_cat', table_name='subscription')
+    op.drop_index('ix_sub_user_nextbill', table_name='subscription')
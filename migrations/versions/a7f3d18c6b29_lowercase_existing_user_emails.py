@@ -0,0 +1,49 @@
+"""Lowercase existing user emails
+
+Revision ID: a7f3d18c6b29
+Revises: e94b1f6a2c58
+Create Date: 2026-08-27 17:21:40.883519
+
+"""
+from collections import Counter
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7f3d18c6b29'
+down_revision = 'e94b1f6a2c58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Login now lower-cases the submitted address before querying, so any
+    # stored mixed-case email would no longer match. Canonicalize existing
+    # rows the same way the register/login routes do.
+    connection = op.get_bind()
+    # "user" is a reserved word on PostgreSQL, so the identifier must be quoted.
+    rows = connection.execute(sa.text('SELECT id, email FROM "user"')).fetchall()
+    canonical_counts = Counter(email.strip().lower() for _, email in rows)
+
+    for user_id, email in rows:
+        canonical = email.strip().lower()
+        if canonical == email:
+            continue
+        if canonical_counts[canonical] > 1:
+            # Lower-casing this row would collide with another account on the
+            # unique index; leave it for manual resolution rather than abort
+            # the migration or clobber either account.
+            print(f"WARNING: user id={user_id} email {email!r} collides "
+                  f"case-insensitively with another account; left unchanged.")
+            continue
+        connection.execute(
+            sa.text('UPDATE "user" SET email = :canonical WHERE id = :id'),
+            {'canonical': canonical, 'id': user_id}
+        )
+
+
+def downgrade():
+    # The original casing is not recoverable; lower-cased emails stay as-is.
+    pass
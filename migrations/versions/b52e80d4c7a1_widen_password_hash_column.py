@@ -0,0 +1,32 @@
+"""Widen password hash column
+
+Revision ID: b52e80d4c7a1
+Revises: 3f9a6c05e1db
+Create Date: 2026-08-27 13:40:17.092643
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b52e80d4c7a1'
+down_revision = '3f9a6c05e1db'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # scrypt hashes are 162 characters, which overflowed String(128) on
+    # backends that enforce length.
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.alter_column('password_hash',
+                              existing_type=sa.String(length=128),
+                              type_=sa.String(length=256))
+
+
+def downgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.alter_column('password_hash',
+                              existing_type=sa.String(length=256),
+                              type_=sa.String(length=128))
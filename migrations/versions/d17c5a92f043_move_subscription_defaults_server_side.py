@@ -0,0 +1,47 @@
+"""Move subscription defaults server side
+
+Revision ID: d17c5a92f043
+Revises: b52e80d4c7a1
+Create Date: 2026-08-27 14:28:55.310876
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd17c5a92f043'
+down_revision = 'b52e80d4c7a1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Fill any rows that relied on the old Python-side defaults (including
+    # the legacy 'Not Tracked' spelling) before adding NOT NULL.
+    connection = op.get_bind()
+    connection.execute(sa.text(
+        "UPDATE subscription SET usage_frequency = 'not_tracked' "
+        "WHERE usage_frequency IS NULL OR usage_frequency = 'Not Tracked'"))
+    connection.execute(sa.text(
+        "UPDATE subscription SET value_rating = 0 WHERE value_rating IS NULL"))
+    connection.execute(sa.text(
+        "UPDATE subscription SET category = 'Other' WHERE category IS NULL"))
+
+    with op.batch_alter_table('subscription') as batch_op:
+        batch_op.alter_column('usage_frequency', existing_type=sa.String(length=50),
+                              nullable=False, server_default='not_tracked')
+        batch_op.alter_column('value_rating', existing_type=sa.Integer(),
+                              nullable=False, server_default='0')
+        batch_op.alter_column('category', existing_type=sa.String(length=100),
+                              nullable=False, server_default='Other')
+
+
+def downgrade():
+    with op.batch_alter_table('subscription') as batch_op:
+        batch_op.alter_column('category', existing_type=sa.String(length=100),
+                              nullable=True, server_default=None)
+        batch_op.alter_column('value_rating', existing_type=sa.Integer(),
+                              nullable=True, server_default=None)
+        batch_op.alter_column('usage_frequency', existing_type=sa.String(length=50),
+                              nullable=True, server_default=None)
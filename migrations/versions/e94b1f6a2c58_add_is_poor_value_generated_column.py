@@ -0,0 +1,38 @@
+"""Add is_poor_value generated column
+
+Revision ID: e94b1f6a2c58
+Revises: d17c5a92f043
+Create Date: 2026-08-27 16:05:23.644107
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e94b1f6a2c58'
+down_revision = 'd17c5a92f043'
+branch_labels = None
+depends_on = None
+
+_POOR_VALUE_SQL = (
+    "(usage_frequency IN ('not_tracked', 'monthly')) AND "
+    "((billing_frequency = 'monthly' AND cost > 30) OR "
+    "(billing_frequency = 'yearly' AND cost > 365))"
+)
+
+
+def upgrade():
+    # Batch mode recreates the table, which lets SQLite accept a STORED
+    # generated column (plain ADD COLUMN only supports VIRTUAL there).
+    with op.batch_alter_table('subscription') as batch_op:
+        batch_op.add_column(sa.Column(
+            'is_poor_value', sa.Boolean(),
+            sa.Computed(_POOR_VALUE_SQL, persisted=True)))
+        batch_op.create_index('ix_sub_poor', ['user_id', 'is_poor_value'])
+
+
+def downgrade():
+    with op.batch_alter_table('subscription') as batch_op:
+        batch_op.drop_index('ix_sub_poor')
+        batch_op.drop_column('is_poor_value')
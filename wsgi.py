@@ -0,0 +1,10 @@
+"""WSGI entrypoint for production servers.
+
+Run with, for example:
+
+    gunicorn -w 5 -k gthread --threads 4 --preload wsgi:app
+
+--preload imports the app (and builds the SQLAlchemy engine and pool)
+once in the master before forking workers.
+"""
+from app import app  # noqa: F401